@@ -17,6 +17,13 @@ class Config:
     # Application Configuration
     ENVIRONMENT = os.getenv('ENVIRONMENT', 'production')
     BACKUP_FILE_PATH = os.getenv('BACKUP_FILE_PATH', 'data/failed_writes.jsonl')
+    DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', 50))
+    DB_FLUSH_INTERVAL = float(os.getenv('DB_FLUSH_INTERVAL', 2.0))
+
+    # PvP Game Tracker Configuration
+    PVP_MAX_TRACKED_GAMES = int(os.getenv('PVP_MAX_TRACKED_GAMES', 5000))
+    PVP_GAME_TTL_SECONDS = int(os.getenv('PVP_GAME_TTL_SECONDS', 1800))
+    PVP_STATS_INTERVAL = int(os.getenv('PVP_STATS_INTERVAL', 60))
     
     
     @classmethod
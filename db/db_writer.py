@@ -1,43 +1,78 @@
 import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 from loguru import logger
 from .database import DatabaseManager
 
+# Per-game history tables (pvp_game, pvp_game_player) are defined in db/schema/pvp_history.sql
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """Parse an ISO game timestamp (e.g. "2025-11-15T18:57:54Z") to naive UTC"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
 class DBWriter:
-    def __init__(self, db_manager: DatabaseManager, backup_file: str = "data/failed_writes.jsonl"):
+    def __init__(self, db_manager: DatabaseManager, backup_file: str = "data/failed_writes.jsonl",
+                 batch_size: int = 50, flush_interval: float = 2.0):
         self.db = db_manager
         self.backup_file = backup_file
         self.retry_delay = 2
         self.max_retries = 2
-        
+        self.batch_size = batch_size          # Max completed games per transaction
+        self.flush_interval = flush_interval  # Max seconds a game waits for its batch
+
     async def process_queue(self, queue: asyncio.Queue):
         logger.info("🚀 DB Writer Worker started...")
-        
+
         while True:
             try:
-                players_data = await queue.get()
-                await self._write_game_players(players_data)
-                queue.task_done()
-                
+                batch = await self._collect_batch(queue)
+
+                success = await self._write_batch_with_retry(batch)
+                if not success:
+                    # Write games one by one so only the failing ones are backed up
+                    await self._write_games_individually(batch)
+
+                for _ in batch:
+                    queue.task_done()
+
             except Exception as e:
                 logger.error(f"❌ Queue processing error: {e}")
                 await asyncio.sleep(1)
-    
-    async def _write_game_players(self, players_data: list):        
-        for player in players_data:
-            success = await self._write_player_with_retry(player)
-            
-            if not success:
-                # Backup to file if all retries failed
-                await self._backup_to_file(player)
-    
-    async def _write_player_with_retry(self, player: dict) -> bool:        
+
+    async def _collect_batch(self, queue: asyncio.Queue) -> list:
+        """Wait for one game, then keep draining until the batch is full or the flush interval passes"""
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _write_batch_with_retry(self, batch: list) -> bool:
         for attempt in range(1, self.max_retries + 1):
             try:
-                await self._write_player(player)
+                await self._write_batch(batch)
                 return True
-                
+
             except Exception as e:
                 if attempt < self.max_retries:
                     wait_time = self.retry_delay * (2 ** (attempt - 1))
@@ -46,117 +81,247 @@ class DBWriter:
                 else:
                     logger.error(f"❌ DB write failed after {self.max_retries} attempts: {e}")
                     return False
-        
+
         return False
-    
-    async def _write_player(self, player: dict):        
+
+    async def _write_games_individually(self, batch: list):
+        """Fallback after a failed bulk write: one transaction per game, backup only what still fails"""
+        if len(batch) > 1:
+            logger.warning(f"⚠️ Splitting failed batch of {len(batch)} games into single-game writes")
+
+        failed = 0
+        for game in batch:
+            try:
+                await self._write_batch([game])
+            except Exception as e:
+                failed += 1
+                logger.error(f"❌ DB write failed for game {game.get('game_id')}: {e}")
+                # Backup to file if the single-game write failed too
+                await self._backup_to_file(game)
+
+        if failed:
+            logger.warning(f"💾 {failed}/{len(batch)} games backed up after single-game retry")
+
+    async def _write_batch(self, batch: list):
         async with self.db.get_connection() as conn:
             async with conn.cursor() as cursor:
                 try:
                     await conn.begin()
-                    
-                    # IMPORTANT: Using positional parameters (%s) for aiomysql
-                    # Not named parameters like %(username)s
-                    upsert_user_sql = """
-                        INSERT INTO user (
-                            username,
-                            external_id,
-                            profile_url,
-                            level,
-                            avatar_url,
-                            avatar_hash,
-                            website,
-                            created_at,
-                            updated_at
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()
-                        )
-                        ON DUPLICATE KEY UPDATE
-                            username = VALUES(username),
-                            profile_url = VALUES(profile_url),
-                            level = VALUES(level),
-                            avatar_url = VALUES(avatar_url),
-                            updated_at = NOW()
-                    """
-                    
-                    await cursor.execute(upsert_user_sql, (
-                        player['username'],
-                        player['external_id'],
-                        player['profile_url'],
-                        player['level'],
-                        player['avatar_url'],
-                        player['avatar_hash'],
-                        player['website']
-                    ))
-                    
-                    # Get the user's internal ID
+
+                    # --- STEP 1: SKIP GAMES ALREADY IN HISTORY (idempotent on game ID) ---
+                    games = {}
+                    for game in batch:
+                        games[(game['website'], game['game_id'])] = game
+
+                    placeholders = ", ".join(["(%s, %s)"] * len(games))
                     await cursor.execute(
-                        "SELECT id FROM user WHERE external_id = %s AND website = %s",
-                        (player['external_id'], player['website'])
+                        f"SELECT website, game_id FROM pvp_game WHERE (website, game_id) IN ({placeholders}) FOR UPDATE",
+                        [value for key in games for value in key]
                     )
-                    result = await cursor.fetchone()
-                    
-                    if not result:
-                        raise Exception(f"Failed to retrieve user_id for external_id={player['external_id']}")
-                    
-                    user_id = result[0]
-                    
-                    # --- STEP 2: UPDATE DAILY WAGER ---
-                    # Parse date from game timestamp or use today
-                    if player.get('date'):
-                        try:
-                            # Parse ISO timestamp from game (e.g., "2025-11-15T18:57:54")
-                            wager_date = datetime.fromisoformat(player['date'].replace('Z', '+00:00')).date()
-                        except:
-                            wager_date = datetime.now().date()
-                    else:
-                        wager_date = datetime.now().date()
-                    
-                    upsert_wager_sql = """
-                        INSERT INTO user_daily_wager (
-                            user_id,
-                            date,
-                            total_wager,
-                            created_at,
-                            updated_at
-                        ) VALUES (
-                            %s, %s, %s, NOW(), NOW()
+                    for row in await cursor.fetchall():
+                        games.pop((row[0], row[1]), None)
+
+                    if not games:
+                        await conn.commit()
+                        logger.info(f"⏭️ Skipped batch of {len(batch)} already recorded games")
+                        return
+
+                    # --- STEP 2: UPSERT USERS ---
+                    # IMPORTANT: Using positional parameters (%s) for aiomysql
+                    # Not named parameters like %(username)s
+                    users = {}
+                    for game in games.values():
+                        for player in game['players']:
+                            users[(player['external_id'], player['website'])] = player
+
+                    user_ids = {}
+                    if users:
+                        upsert_user_sql = f"""
+                            INSERT INTO user (
+                                username,
+                                external_id,
+                                profile_url,
+                                level,
+                                avatar_url,
+                                avatar_hash,
+                                website,
+                                created_at,
+                                updated_at
+                            ) VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())"] * len(users))}
+                            ON DUPLICATE KEY UPDATE
+                                username = VALUES(username),
+                                profile_url = VALUES(profile_url),
+                                level = VALUES(level),
+                                avatar_url = VALUES(avatar_url),
+                                updated_at = NOW()
+                        """
+
+                        params = []
+                        for player in users.values():
+                            params.extend((
+                                player['username'],
+                                player['external_id'],
+                                player['profile_url'],
+                                player['level'],
+                                player['avatar_url'],
+                                player['avatar_hash'],
+                                player['website']
+                            ))
+                        await cursor.execute(upsert_user_sql, params)
+
+                        # Get the users' internal IDs
+                        placeholders = ", ".join(["(%s, %s)"] * len(users))
+                        await cursor.execute(
+                            f"SELECT id, external_id, website FROM user WHERE (external_id, website) IN ({placeholders})",
+                            [value for key in users for value in key]
                         )
-                        ON DUPLICATE KEY UPDATE
-                            total_wager = total_wager + VALUES(total_wager),
-                            updated_at = NOW()
+                        user_ids = {(row[1], row[2]): row[0] for row in await cursor.fetchall()}
+
+                        missing = [key[0] for key in users if key not in user_ids]
+                        if missing:
+                            raise Exception(f"Failed to retrieve user_id for external_id={', '.join(missing)}")
+
+                    # Use the game timestamp, or now (UTC) if it's missing, for both wager date and history
+                    finished_at = {
+                        key: _parse_timestamp(game.get('date')) or datetime.now(timezone.utc).replace(tzinfo=None)
+                        for key, game in games.items()
+                    }
+
+                    # --- STEP 3: UPDATE DAILY WAGER ---
+                    # Sum per (user, date) first so each row is touched once per batch
+                    daily_wagers = {}
+                    for game_key, game in games.items():
+                        wager_date = finished_at[game_key].date()
+
+                        for player in game['players']:
+                            key = (user_ids[(player['external_id'], player['website'])], wager_date)
+                            daily_wagers[key] = daily_wagers.get(key, 0.0) + player['total_bet']
+
+                    if daily_wagers:
+                        upsert_wager_sql = f"""
+                            INSERT INTO user_daily_wager (
+                                user_id,
+                                date,
+                                total_wager,
+                                created_at,
+                                updated_at
+                            ) VALUES {", ".join(["(%s, %s, %s, NOW(), NOW())"] * len(daily_wagers))}
+                            ON DUPLICATE KEY UPDATE
+                                total_wager = total_wager + VALUES(total_wager),
+                                updated_at = NOW()
+                        """
+
+                        params = []
+                        for (user_id, wager_date), total_wager in daily_wagers.items():
+                            params.extend((user_id, wager_date, total_wager))
+                        await cursor.execute(upsert_wager_sql, params)
+
+                    # --- STEP 4: INSERT GAME HISTORY ---
+                    game_rows = []
+                    player_rows = []
+                    player_count = 0
+                    for game_key, game in games.items():
+                        game_rows.extend((
+                            game['website'],
+                            game['game_id'],
+                            game.get('type'),
+                            game.get('mode'),
+                            game.get('currency'),
+                            game.get('strategy'),
+                            game.get('is_private'),
+                            game.get('fast_mode'),
+                            game.get('max_players'),
+                            game.get('initial_bet', 0),
+                            game.get('total_bet', 0),
+                            game.get('total_payout', 0),
+                            len(game.get('rounds', [])),
+                            game.get('bot_count', 0),
+                            json.dumps(game.get('rounds', [])),
+                            game.get('complete', True),
+                            _parse_timestamp(game.get('created_at')),
+                            finished_at[game_key]
+                        ))
+
+                        for player in game['players']:
+                            player_rows.extend((
+                                game['website'],
+                                game['game_id'],
+                                user_ids[(player['external_id'], player['website'])],
+                                player['total_bet'],
+                                player['total_payout'],
+                                player['total_profit'],
+                                player.get('times_won', 0),
+                                finished_at[game_key]
+                            ))
+                            player_count += 1
+
+                    insert_game_sql = f"""
+                        INSERT INTO pvp_game (
+                            website,
+                            game_id,
+                            type,
+                            mode,
+                            currency,
+                            strategy,
+                            is_private,
+                            fast_mode,
+                            max_players,
+                            initial_bet,
+                            total_bet,
+                            total_payout,
+                            round_count,
+                            bot_count,
+                            rounds,
+                            complete_history,
+                            started_at,
+                            finished_at,
+                            created_at
+                        ) VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"] * len(games))}
                     """
-                    
-                    await cursor.execute(upsert_wager_sql, (
-                        user_id,
-                        wager_date,
-                        player['total_bet']
-                    ))
-                    
+                    await cursor.execute(insert_game_sql, game_rows)
+
+                    if player_rows:
+                        insert_player_sql = f"""
+                            INSERT INTO pvp_game_player (
+                                website,
+                                game_id,
+                                user_id,
+                                total_bet,
+                                total_payout,
+                                total_profit,
+                                times_won,
+                                finished_at
+                            ) VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * player_count)}
+                        """
+                        await cursor.execute(insert_player_sql, player_rows)
+
                     # Commit transaction
                     await conn.commit()
-                    
-                    logger.success(f"✅ DB Write Success: User={player['username']} (ID={user_id}), Bet=${player['total_bet']}, Date={wager_date}")
-                    
+
+                    logger.success(
+                        f"✅ DB Write Success: Games={len(games)}, Players={player_count}, "
+                        f"Wager rows={len(daily_wagers)}, Skipped={len(batch) - len(games)}"
+                    )
+
                 except Exception as e:
                     # Rollback on error
                     await conn.rollback()
                     raise e
-    
-    async def _backup_to_file(self, player: dict):
+
+    async def _backup_to_file(self, game: dict):
         """Backup failed writes to JSONL file"""
         try:
             import os
             os.makedirs(os.path.dirname(self.backup_file), exist_ok=True)
-            
+
             with open(self.backup_file, 'a') as f:
                 backup_entry = {
                     'timestamp': datetime.now().isoformat(),
-                    'player': player
+                    'game': game
                 }
                 f.write(json.dumps(backup_entry) + '\n')
-            
+
             logger.warning(f"💾 Backed up to file: {self.backup_file}")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to backup to file: {e}")
\ No newline at end of file
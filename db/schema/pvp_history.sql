@@ -0,0 +1,42 @@
+-- Per-game PvP history written by DBWriter.
+-- Apply out of band alongside the user / user_daily_wager tables; the app never issues DDL.
+
+CREATE TABLE IF NOT EXISTS pvp_game (
+    id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    website VARCHAR(32) NOT NULL,
+    game_id VARCHAR(64) NOT NULL,
+    type VARCHAR(32) NULL,
+    mode VARCHAR(32) NULL,
+    currency VARCHAR(16) NULL,
+    strategy VARCHAR(32) NULL,
+    is_private TINYINT(1) NULL,
+    fast_mode TINYINT(1) NULL,
+    max_players SMALLINT UNSIGNED NULL,
+    initial_bet DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    total_bet DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    total_payout DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    round_count SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    bot_count SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    rounds JSON NULL,
+    -- 0 when the game was only seen through updatePvpGame (no type/mode/rounds/initial bet)
+    complete_history TINYINT(1) NOT NULL DEFAULT 1,
+    started_at DATETIME NULL,
+    finished_at DATETIME NOT NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_pvp_game_website_game (website, game_id),
+    KEY idx_pvp_game_finished_at (finished_at)
+);
+
+CREATE TABLE IF NOT EXISTS pvp_game_player (
+    website VARCHAR(32) NOT NULL,
+    game_id VARCHAR(64) NOT NULL,
+    user_id BIGINT UNSIGNED NOT NULL,
+    total_bet DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    total_payout DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    total_profit DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    times_won SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    finished_at DATETIME NOT NULL,
+    PRIMARY KEY (website, game_id, user_id),
+    KEY idx_pvp_game_player_user_finished (user_id, finished_at)
+);
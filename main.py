@@ -2,6 +2,7 @@ import asyncio
 import sys
 from loguru import logger
 from sockets.hypedrop import HypeDropSocket
+from sockets.pvp_tracker import PvpGameTracker
 from db.database import DatabaseManager
 from db.db_writer import DBWriter
 from config.config import Config
@@ -16,19 +17,31 @@ async def console_printer(queue: asyncio.Queue):
     logger.info("🖥️ Console Printer started...")
     
     while True:
-        data = await queue.get()
+        game = await queue.get()
+        players = game.get("players", [])
         
-        if isinstance(data, list) and len(data) > 0:
+        if players:
             print("\n" + "="*50)
-            print(f"🎰 GAME FINISHED ({len(data)} Players)")
+            print(f"🎰 GAME FINISHED {game['game_id']} ({len(players)} Players, {len(game['rounds'])} Rounds)")
             print("="*50)
             
-            for p in data:
+            for p in players:
                 print(f"👤 {p['username']} | 💰 ${p['total_bet']}")
         
         queue.task_done()
 
 
+async def tracker_stats_logger(tracker: PvpGameTracker, interval: int):
+    """Periodically log live PvP aggregates from the game tracker"""
+    while True:
+        await asyncio.sleep(interval)
+        stats = tracker.stats()
+        logger.info(
+            f"📊 PvP live: open={stats['open_games']} | in-flight=${stats['wager_in_flight']} | "
+            f"completed={stats['games_completed']} | evicted={stats['games_evicted']}"
+        )
+
+
 async def main():
     # 1. Initialize Database with config from environment
     db_manager = DatabaseManager(Config.get_db_config())
@@ -37,13 +50,19 @@ async def main():
     # 2. Create Shared Queue
     data_queue = asyncio.Queue()
     
-    # 3. Initialize Sockets
-    hypedrop = HypeDropSocket(data_queue)
+    # 3. Initialize Sockets (with live PvP game state tracker)
+    pvp_tracker = PvpGameTracker(
+        max_games=Config.PVP_MAX_TRACKED_GAMES,
+        ttl_seconds=Config.PVP_GAME_TTL_SECONDS
+    )
+    hypedrop = HypeDropSocket(data_queue, tracker=pvp_tracker)
     
     # 4. Initialize DB Writer
     db_writer = DBWriter(
         db_manager=db_manager,
-        backup_file=Config.BACKUP_FILE_PATH
+        backup_file=Config.BACKUP_FILE_PATH,
+        batch_size=Config.DB_BATCH_SIZE,
+        flush_interval=Config.DB_FLUSH_INTERVAL
     )
     
     # 5. Create Tasks
@@ -56,6 +75,11 @@ async def main():
         name="DBWriter"
     )
     
+    stats_task = asyncio.create_task(
+        tracker_stats_logger(pvp_tracker, Config.PVP_STATS_INTERVAL),
+        name="PvpStats"
+    )
+    
     try:
         logger.info(f"🚀 Starting application in {Config.ENVIRONMENT} mode")
 
@@ -65,6 +89,7 @@ async def main():
         await asyncio.gather(
             *socket_tasks,
             db_task,
+            stats_task,
             # console_printer(queue=data_queue)  # Disabled - causes race condition
         )
     except KeyboardInterrupt:
@@ -1,11 +1,14 @@
 import json
 import asyncio
+from typing import Optional
 from .base_socket import BaseSocket
+from .pvp_tracker import PvpGameTracker
 
 class HypeDropSocket(BaseSocket):
-    def __init__(self, queue):
+    def __init__(self, queue, tracker: Optional[PvpGameTracker] = None):
         url = "wss://router.hypedrop.com/ws"
         super().__init__(url, queue, source_name="HypeDrop")
+        self.tracker = tracker or PvpGameTracker()
         self.connection_headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Origin": "https://www.hypedrop.com",
@@ -44,43 +47,24 @@ class HypeDropSocket(BaseSocket):
 
             payload = data.get("payload", {}).get("data", {})
 
-            if "updatePvpGame" not in payload:
+            is_create = "createPvpGame" in payload
+            if is_create:
+                event = payload["createPvpGame"]
+            elif "updatePvpGame" in payload:
+                event = payload["updatePvpGame"]
+            else:
                 return None
 
-            game = payload["updatePvpGame"]["pvpGame"]
-
-            if game.get("status") != "FINISHED":
+            game = (event or {}).get("pvpGame")
+            if not game:
                 return None
 
-            game_date = game.get("updatedAt")
-            real_players = []
-
-            for player in game.get("players", []):
-                if player.get("isPvpBot") is True:
-                    continue
-
-                user_info = player.get("user", {})
-                external_id = player.get("userId")
-
-                player_data = {
-                    "external_id": external_id,
-                    "username": user_info.get("displayName"),
-                    "profile_url": f"https://www.hypedrop.com/player/{external_id}/summary",
-                    "level": str(user_info.get("level", "")),
-                    "avatar_url": user_info.get("avatar"),
-                    "avatar_hash": None,
-                    "website": "hypedrop",
-                    "total_bet": float(player.get("totalBet", 0)),
-                    "total_profit": float(player.get("totalProfit", 0)),
-                    "total_payout": float(player.get("totalPayout", 0)),
-                    "date": game_date
-                }
-                real_players.append(player_data)
+            completed = self.tracker.apply(game, is_create=is_create)
 
-            if not real_players:
+            if not completed or not completed["players"]:
                 return None
 
-            return real_players
+            return completed
 
         except Exception as e:
             from loguru import logger
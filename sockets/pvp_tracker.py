@@ -0,0 +1,273 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from loguru import logger
+
+
+# Statuses after which a game receives no further updates
+TERMINAL_STATUSES = frozenset({"FINISHED", "CANCELED", "CANCELLED", "ABORTED", "EXPIRED"})
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _compact_player(player: dict) -> tuple:
+    """Keep only the PvpGamePlayer fields needed to build a completed game"""
+    user_info = player.get("user") or {}
+    return (
+        player.get("isPvpBot") is True,
+        user_info.get("displayName"),
+        str(user_info.get("level", "")),
+        user_info.get("avatar"),
+        _to_float(player.get("totalBet")),
+        _to_float(player.get("totalPayout")),
+        _to_float(player.get("totalProfit")),
+        int(player.get("timesWon") or 0),
+    )
+
+
+class PvpGameRecord:
+    """Compact live state for a single PvP game"""
+
+    __slots__ = (
+        "game_id", "type", "mode", "status", "currency", "strategy",
+        "is_private", "fast_mode", "max_players", "initial_bet",
+        "created_at", "updated_at", "total_bet", "total_payout",
+        "active_round", "rounds", "players", "seen_created", "last_seen",
+    )
+
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        self.type = None
+        self.mode = None
+        self.status = None
+        self.currency = None
+        self.strategy = None
+        self.is_private = None
+        self.fast_mode = None
+        self.max_players = None
+        self.initial_bet = 0.0
+        self.created_at = None
+        self.updated_at = None
+        self.total_bet = 0.0
+        self.total_payout = 0.0
+        self.active_round = None
+        self.rounds = ()        # (id, round_id, bet, box_id) per round, in order
+        self.players = {}       # userId -> (is_bot, display_name, level, avatar, total_bet, total_payout, total_profit, times_won)
+        self.seen_created = False  # False if only updatePvpGame deltas were seen (partial history)
+        self.last_seen = 0.0
+
+    def apply(self, game: dict):
+        """Apply a createPvpGame / updatePvpGame payload; absent keys keep their value"""
+        if "type" in game:
+            self.type = game["type"]
+        if "mode" in game:
+            self.mode = game["mode"]
+        if "status" in game:
+            self.status = game["status"]
+        if "currency" in game:
+            self.currency = game["currency"]
+        if "strategy" in game:
+            self.strategy = game["strategy"]
+        if "isPrivate" in game:
+            self.is_private = game["isPrivate"]
+        if "fastMode" in game:
+            self.fast_mode = game["fastMode"]
+        if "maxPlayers" in game:
+            self.max_players = game["maxPlayers"]
+        if "initialBet" in game:
+            self.initial_bet = _to_float(game["initialBet"])
+        if "createdAt" in game:
+            self.created_at = game["createdAt"]
+        if "updatedAt" in game:
+            self.updated_at = game["updatedAt"]
+        if "totalBet" in game:
+            self.total_bet = _to_float(game["totalBet"])
+        if "totalPayout" in game:
+            self.total_payout = _to_float(game["totalPayout"])
+
+        active_round = game.get("activeRound")
+        if active_round:
+            self.active_round = active_round.get("number")
+
+        rounds = game.get("rounds")
+        if rounds:
+            # Round status is left out: only createPvpGame selects rounds, so it would go stale
+            parsed = []
+            for edge in rounds.get("edges") or []:
+                node = edge.get("node") or {}
+                box = node.get("box") or {}
+                parsed.append((
+                    node.get("id"),
+                    node.get("roundId"),
+                    _to_float(node.get("bet")),
+                    box.get("id"),
+                ))
+            self.rounds = tuple(parsed)
+
+        players = game.get("players")
+        if players is not None:
+            self.players = {
+                p["userId"]: _compact_player(p)
+                for p in players if p.get("userId")
+            }
+
+    def to_completed(self) -> dict:
+        """Full game detail plus the real (non-bot) players in the DB writer format"""
+        real_players = []
+        bot_count = 0
+
+        for external_id, player in self.players.items():
+            is_bot, display_name, level, avatar, total_bet, total_payout, total_profit, times_won = player
+            if is_bot:
+                bot_count += 1
+                continue
+
+            real_players.append({
+                "external_id": external_id,
+                "username": display_name,
+                "profile_url": f"https://www.hypedrop.com/player/{external_id}/summary",
+                "level": level,
+                "avatar_url": avatar,
+                "avatar_hash": None,
+                "website": "hypedrop",
+                "total_bet": total_bet,
+                "total_profit": total_profit,
+                "total_payout": total_payout,
+                "times_won": times_won,
+                "date": self.updated_at
+            })
+
+        return {
+            "game_id": self.game_id,
+            "website": "hypedrop",
+            "type": self.type,
+            "mode": self.mode,
+            "status": self.status,
+            "currency": self.currency,
+            "strategy": self.strategy,
+            "is_private": self.is_private,
+            "fast_mode": self.fast_mode,
+            "max_players": self.max_players,
+            "initial_bet": self.initial_bet,
+            "total_bet": self.total_bet,
+            "total_payout": self.total_payout,
+            "created_at": self.created_at,
+            "date": self.updated_at,
+            "rounds": [
+                {"id": row_id, "round_id": round_id, "bet": bet, "box_id": box_id}
+                for row_id, round_id, bet, box_id in self.rounds
+            ],
+            "complete": self.seen_created,
+            "bot_count": bot_count,
+            "players": real_players,
+        }
+
+
+class PvpGameTracker:
+    """
+    Incremental store of live PvP games built from the createPvpGame and
+    updatePvpGame streams. Games are kept in last-seen order so TTL and size
+    eviction only ever look at the oldest entries.
+    """
+
+    def __init__(self, max_games: int = 5000, ttl_seconds: float = 1800, finished_memory: int = 10000):
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self.finished_memory = finished_memory
+
+        self.games: "OrderedDict[str, PvpGameRecord]" = OrderedDict()
+        self._finished_ids: "OrderedDict[str, None]" = OrderedDict()
+
+        # Live aggregates, maintained on every delta
+        self.wager_in_flight = 0.0
+        self.games_completed = 0
+        self.games_evicted = 0
+
+    @property
+    def open_games(self) -> int:
+        return len(self.games)
+
+    def apply(self, game: dict, now: Optional[float] = None, is_create: bool = False) -> Optional[dict]:
+        """
+        Apply a create/update payload. Returns the completed game when this
+        delta moves it to FINISHED, otherwise None. Any terminal status drops
+        the game from the live aggregates. `is_create` marks createPvpGame
+        payloads, the only ones carrying type, mode, rounds and initial bet.
+        """
+        game_id = game.get("id")
+        if not game_id or game_id in self._finished_ids:
+            return None
+
+        now = time.monotonic() if now is None else now
+
+        # Touch this game before the TTL sweep so a long-idle but live game isn't evicted by its own update
+        record = self.games.get(game_id)
+        if record is None:
+            record = PvpGameRecord(game_id)
+            self.games[game_id] = record
+        else:
+            self.games.move_to_end(game_id)
+        record.last_seen = now
+
+        self._evict_expired(now)
+
+        previous_bet = record.total_bet
+        record.apply(game)
+        if is_create:
+            record.seen_created = True
+        self.wager_in_flight += record.total_bet - previous_bet
+
+        if record.status in TERMINAL_STATUSES:
+            self._remove(game_id)
+            self._remember_finished(game_id)
+            if record.status != "FINISHED":
+                return None
+            self.games_completed += 1
+            return record.to_completed()
+
+        if len(self.games) > self.max_games:
+            oldest_id = next(iter(self.games))
+            self._remove(oldest_id)
+            self.games_evicted += 1
+
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "open_games": self.open_games,
+            "wager_in_flight": round(self.wager_in_flight, 2),
+            "games_completed": self.games_completed,
+            "games_evicted": self.games_evicted,
+        }
+
+    def _remove(self, game_id: str):
+        record = self.games.pop(game_id)
+        self.wager_in_flight -= record.total_bet
+        if not self.games:
+            # Reset float drift once nothing is in flight
+            self.wager_in_flight = 0.0
+
+    def _remember_finished(self, game_id: str):
+        self._finished_ids[game_id] = None
+        if len(self._finished_ids) > self.finished_memory:
+            self._finished_ids.popitem(last=False)
+
+    def _evict_expired(self, now: float):
+        cutoff = now - self.ttl_seconds
+        evicted = 0
+
+        while self.games:
+            oldest_id, oldest = next(iter(self.games.items()))
+            if oldest.last_seen > cutoff:
+                break
+            self._remove(oldest_id)
+            evicted += 1
+
+        if evicted:
+            self.games_evicted += evicted
+            logger.debug(f"🧹 Evicted {evicted} abandoned PvP games (open={self.open_games})")
@@ -28,8 +28,9 @@ async def csv_writer_worker(queue: asyncio.Queue):
     async with aiofiles.open(OUTPUT_FILE, mode='a', newline='', encoding='utf-8') as afp:
         
         while True:
-            # Get data from the queue (now it's a list of players directly)
-            players = await queue.get()
+            # Get a completed game from the queue and take its real players
+            game = await queue.get()
+            players = game.get("players") if isinstance(game, dict) else None
             
             # Check if we got valid data (list of players)
             if players and isinstance(players, list):